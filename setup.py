@@ -35,7 +35,7 @@ setup(name='scikit-gstat',
       install_requires=requirements(),
       test_suite='nose.collector',
       # test_require=['nose'],
-      extras_require={"gstools": ["gstools>=1.3"]},
+      extras_require={"gstools": ["gstools>=1.3"], "numexpr": ["numexpr"]},
       packages=find_packages(),
       include_package_data=True,
       zip_safe=False
@@ -319,6 +319,8 @@ class DirectionalVariogram(Variogram):
         # set attributes to be filled during calculation
         self.cov = None
         self.cof = None
+        self._compiled_model = None
+        self._compiled_key = None
 
         # settings, not reachable by init (not yet)
         self._cache_experimental = False
@@ -383,6 +383,8 @@ class Variogram(object):
         # set attributes to be filled during calculation
         self.cov = None
         self.cof = None
+        self._compiled_model = None
+        self._compiled_key = None
 
         # settings, not reachable by init (not yet)
         self._cache_experimental = False
@@ -1673,14 +1675,18 @@ class Variogram(object):
 
         # For a supported model, wrap the function depending on nugget and get logical bounds
         if not self._is_model_custom:
+            # the optimizers evaluate the model on the same lags in
+            # every iteration, thus the lags are prepared only once
+            lags = models.VariogramKernel(_x)
+
             # Switch the method
             # wrap the model to include or exclude the nugget
             if self.use_nugget:
-                def wrapped(*args):
-                    return self._model(*args)
+                def wrapped(h, *args):
+                    return self._model(lags if h is _x else h, *args)
             else:
-                def wrapped(*args):
-                    return self._model(*args, 0)
+                def wrapped(h, *args):
+                    return self._model(lags if h is _x else h, *args, 0)
 
             # get p0
             if bounds is None:
@@ -1740,11 +1746,11 @@ class Variogram(object):
 
             # define the loss function to be minimized
             def ml(params):
-                # predict
-                pred = [wrapped(_, *params) for _ in _x]
+                # predict all lags at once
+                pred = wrapped(_x, *params)
 
                 # get the probabilities of _y
-                p = [stats.norm.logpdf(_p, loc=o, scale=1.) for _p, o in zip(pred, _y)]
+                p = stats.norm.logpdf(pred, loc=_y, scale=1.)
 
                 # weight the probs
                 return - np.sum(p * sigma)
@@ -1819,8 +1825,8 @@ class Variogram(object):
 
         Returns a callable that takes a distance value and returns a
         semivariance. This model is fitted to the current Variogram
-        parameters. The function will be interpreted at return time with the
-        parameters hard-coded into the function code.
+        parameters. The parameters are hard-coded into the returned function,
+        which is cached until the parameters change.
 
         Returns
         -------
@@ -1831,7 +1837,13 @@ class Variogram(object):
         if self.cof is None:
             self.fit(force=True)
 
-        return self.fitted_model_function(self._model, self.cof)
+        # the specialized model is only rebuilt on a new model or parameters
+        key = (self._model, tuple(self.cof))
+        if self._compiled_model is None or self._compiled_key != key:
+            self._compiled_model = self.fitted_model_function(self._model, self.cof)
+            self._compiled_key = key
+
+        return self._compiled_model
 
     @classmethod
     def fitted_model_function(cls, model, cof=None, **kw):
@@ -1854,15 +1866,9 @@ class Variogram(object):
                 model = getattr(models, model)
 
         if model.__name__ == "harmonize":
-            code = """fitted_model = lambda x: model(x)"""
+            return models.specialize(model)
         else:
-            code = """fitted_model = lambda x: model(x, %s)""" % \
-               (', '.join([str(_) for _ in cof]))
-
-        # run the code
-        loc = dict(model=model)
-        exec(code, loc, loc)
-        return loc['fitted_model']
+            return models.specialize(model, *[float(_) for _ in cof])
 
     def _format_values_stack(self, values: np.ndarray) -> np.ndarray:
         """
@@ -1,18 +1,23 @@
 """GSTools Interface."""
-import numpy as np
+import math
 import warnings
 
 
 def stable_rescale(describe):
     """Get GSTools rescale parameter from sk-gstat stable model description."""
-    return np.power(3, 1 / describe["shape"])
+    # tiny shapes overflow, like np.power in the stable model
+    try:
+        return math.pow(3., 1. / describe["shape"])
+    except OverflowError:
+        return math.inf
 
 
+# all entries define rescale and arg_map, the map is never altered at runtime
 MODEL_MAP = dict(
-    spherical=dict(gs_cls="Spherical"),
-    exponential=dict(gs_cls="Exponential", rescale=3.0),
-    gaussian=dict(gs_cls="Gaussian", rescale=2.0),
-    cubic=dict(gs_cls="Cubic"),
+    spherical=dict(gs_cls="Spherical", rescale=1.0, arg_map={}),
+    exponential=dict(gs_cls="Exponential", rescale=3.0, arg_map={}),
+    gaussian=dict(gs_cls="Gaussian", rescale=2.0, arg_map={}),
+    cubic=dict(gs_cls="Cubic", rescale=1.0, arg_map={}),
     stable=dict(
         gs_cls="Stable", arg_map={"alpha": "shape"}, rescale=stable_rescale
     ),
@@ -21,6 +26,26 @@ MODEL_MAP = dict(
     ),
 )
 
+# GSTools module, set after the installed version was checked once
+_GS = None
+
+
+def _import_gstools():
+    """Import GSTools and check the version on first use only."""
+    global _GS
+    if _GS is None:
+        # try to import gstools and notify user if not installed
+        try:
+            import gstools as gs
+        except ImportError as e:  # pragma: no cover
+            raise ImportError("to_gstools: GSTools not installed.") from e
+
+        # at least gstools>=1.3.0 is needed
+        if list(map(int, gs.__version__.split(".")[:2])) < [1, 3]:  # pragma: no cover
+            raise ValueError("to_gstools: GSTools v1.3 or greater required.")
+        _GS = gs
+    return _GS
+
 
 def skgstat_to_gstools(variogram, **kwargs):
     """
@@ -68,15 +93,7 @@ def skgstat_to_gstools(variogram, **kwargs):
     >> cond_pos Variogram.coordinates.T
 
     """
-    # try to import gstools and notify user if not installed
-    try:
-        import gstools as gs
-    except ImportError as e:  # pragma: no cover
-        raise ImportError("to_gstools: GSTools not installed.") from e
-
-    # at least gstools>=1.3.0 is needed
-    if list(map(int, gs.__version__.split(".")[:2])) < [1, 3]:  # pragma: no cover
-        raise ValueError("to_gstools: GSTools v1.3 or greater required.")
+    gs = _import_gstools()
 
     # if Variogram is a cross-variogram warn the user
     if variogram.is_cross_variogram:
@@ -99,8 +116,6 @@ def skgstat_to_gstools(variogram, **kwargs):
     gs_describe = MODEL_MAP[name]
 
     # set variogram parameters
-    gs_describe.setdefault("rescale", 1.0)
-    gs_describe.setdefault("arg_map", dict())
     gs_kwargs = dict(
         var=float(describe["sill"] - describe["nugget"]),
         len_scale=float(describe["effective_range"]),
@@ -164,15 +179,7 @@ def skgstat_to_krige(variogram, **kwargs):
     gstools.Krige
 
     """
-    # try to import gstools and notify user if not installed
-    try:
-        import gstools as gs
-    except ImportError as e:  # pragma: no cover
-        raise ImportError("to_gstools: GSTools not installed.") from e
-
-    # at least gstools>=1.3.0 is needed
-    if list(map(int, gs.__version__.split(".")[:2])) < [1, 3]:  # pragma: no cover
-        raise ValueError("to_gstools: GSTools v1.3 or greater required.")
+    gs = _import_gstools()
 
     # convert variogram to a CovModel
     model = skgstat_to_gstools(variogram=variogram)
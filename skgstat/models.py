@@ -1,25 +1,266 @@
 import math
-from functools import wraps
+from functools import wraps, partial
 
 import numpy as np
-from scipy import special
-from numba import jit
+from numba import njit, prange, types
 
+try:
+    import numexpr as ne
+    NUMEXPR_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    NUMEXPR_AVAILABLE = False
+
+
+# below this number of lags, the threading overhead of the parallel
+# kernels outweighs the speedup and the lags are processed serially
+PARALLEL_THRESHOLD = 1000
+
+# fastmath flags for the kernels, which still handle inf and NaN, as
+# extreme parameters during fitting overflow the range parameter
+FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+
+def _signatures(n_params):
+    # eager signatures of the array kernels for double and single precision
+    # lags, these are compiled on import and cached to disk, instead of on
+    # the first call, which is usually inside of the fitting procedure.
+    # The lags have to be C-contiguous, so that the loops can be vectorized,
+    # read-only lags, like memory maps, are accepted without a copy
+    signatures = []
+    for t in (types.float64, types.float32):
+        for readonly in (False, True):
+            lags = types.Array(t, 1, 'C', readonly=readonly)
+            signatures.append(t[::1](lags, *[t] * n_params))
+    return signatures
+
+
+def _nugget_model(h, c0, b):
+    # a zero range is a pure nugget model, the sill is reached at any lag > 0
+    out = np.full_like(h, b + c0)
+    out[h == 0] = b
+    return out
+
+
+def _core_lags(h):
+    # precondition of all compiled cores: the signatures accept writeable and
+    # read-only lags, but only C-contiguous ones, strided lags are copied
+    if not h.flags.c_contiguous:
+        h = np.ascontiguousarray(h)
+    return h
+
+
+# from this number of lags on, the models are evaluated on a CUDA device,
+# if one is available
+CUDA_THRESHOLD = 1000000
+
+# scipy.special is only needed by the Matérn model and imported on first use
+_SPECIAL = None
+
+
+def _special():
+    global _SPECIAL
+    if _SPECIAL is None:
+        from scipy.special import gamma, kv
+        _SPECIAL = (gamma, kv)
+    return _SPECIAL
+
+
+def _as_lags(h):
+    # float32 lags are kept, as this halves the memory traffic of the kernels
+    h = np.asarray(h)
+    if h.dtype != np.float32:
+        h = np.asarray(h, dtype=float)
+    return h
+
+
+class VariogramKernel(object):
+    """Variogram lag kernel
+
+    Prepares a fixed set of lags for repeated evaluation by the model
+    functions. The optimizers used for fitting evaluate a model on the same
+    lags in every iteration, only the parameters change. The kernel
+    converts the lags into a flat, contiguous float array once, instead of
+    on every call of the model function.
+
+    Parameters
+    ----------
+    h : array-like
+        The lags the model functions shall be evaluated for.
+
+    """
+    def __init__(self, h):
+        h = _as_lags(h)
+        self.shape = h.shape
+        self.h = np.ascontiguousarray(h.ravel())
+
+
+# lag types passed straight to the scalar model functions
+_SCALAR_TYPES = (float, int, np.float64)
+
+
+def _cuda_kernels():
+    # numba.cuda is only imported if needed, as it slows down the import
+    try:
+        from skgstat import models_cuda
+    except ImportError:  # pragma: no cover
+        return dict()
+    return models_cuda.KERNELS if models_cuda.is_available() else dict()
+
+
+def _run_kernel(name, kernel, lags, args, kwargs, backend):
+    # single precision parameters keep the kernels in single precision
+    if lags.dtype == np.float32:
+        args = tuple(np.float32(arg) for arg in args)
+        kwargs = {key: np.float32(val) for key, val in kwargs.items()}
+
+    # huge lag arrays are evaluated on a CUDA device, if available
+    if backend == 'cuda' or (backend is None and lags.size >= CUDA_THRESHOLD):
+        cuda_kernels = _cuda_kernels()
+        if name in cuda_kernels:
+            return cuda_kernels[name](lags, *args, **kwargs)
+        elif backend == 'cuda':
+            raise RuntimeError(
+                'The %s model can not be evaluated on a CUDA device.' % name
+            )
+
+    return kernel(lags, *args, **kwargs)
+
+
+def variogram(func=None, kernel=None):
+    """Variogram decorator
+
+    Maps a variogram function, which is defined for a single lag, over
+    lists, tuples, arrays and any other iterable of lags. If a compiled
+    array ``kernel`` is given, the lags are passed to the kernel at once
+    as an array, instead of calling ``func`` for each lag.
+
+    The decorated function exposes ``func`` as ``py_func`` and the array
+    kernel as ``kernel``. Hot loops can call these entry points directly
+    and skip the dispatch on the lag type.
+
+    The kernels return single precision semi-variances for ``numpy.float32``
+    lag arrays and double precision for all other lags.
+
+    Functions with a kernel accept a ``backend`` keyword argument, which
+    can be ``'cpu'`` or ``'cuda'``. By default, arrays of at least
+    ``CUDA_THRESHOLD`` lags are evaluated on a CUDA device, if available.
+
+    """
+    # support the decorator to be called with arguments
+    if func is None:
+        return lambda f: variogram(f, kernel=kernel)
 
-def variogram(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if hasattr(args[0], '__iter__'):
-            new_args = args[1:]
-            mapping = map(lambda h: func(h, *new_args, **kwargs), args[0])
-            return np.fromiter(mapping, dtype=float)
-        else:
-            return func(*args, **kwargs)
+        first = args[0]
+        # scalar lags are passed on without any further type checks
+        if type(first) in _SCALAR_TYPES and not kwargs:
+            return func(*args)
+
+        # only functions with a kernel take a backend, for all others it is
+        # a regular keyword argument
+        backend = None
+        if kernel is not None:
+            backend = kwargs.pop('backend', None)
+            if backend not in (None, 'cpu', 'cuda'):
+                raise ValueError("backend has to be one of 'cpu' or 'cuda'.")
+
+        # prepared lags can be passed to the kernel directly
+        if type(first) is VariogramKernel:
+            if kernel is not None:
+                gamma = _run_kernel(func.__name__, kernel, first.h, args[1:], kwargs, backend)
+                return gamma.reshape(first.shape)
+            first = first.h.reshape(first.shape)
+
+        # the exact type check is the fast path for arrays, all other
+        # types are checked for being an iterable of lags
+        if type(first) is not np.ndarray:
+            if isinstance(first, str) or not hasattr(first, '__iter__'):
+                return func(*args, **kwargs)
+
+            # iterables other than lists, tuples and arrays, like a range
+            # or pandas.Series, are converted
+            if not isinstance(first, (list, tuple, np.ndarray)):
+                first = np.asarray(list(first), dtype=float)
+
+        if kernel is not None:
+            h = _as_lags(first)
+            gamma = _run_kernel(func.__name__, kernel, h.ravel(), args[1:], kwargs, backend)
+            return gamma.reshape(h.shape)
+        new_args = args[1:]
+        mapping = map(lambda h: func(h, *new_args, **kwargs), first)
+        return np.fromiter(mapping, dtype=float)
+
+    # keep the pure Python function accessible like on numba functions
+    wrapper.py_func = func
+    wrapper.kernel = kernel
     return wrapper
 
 
-@variogram
-@jit(nopython=True)
+def _fitted_model(model, params, h):
+    return model(h, *params)
+
+
+def specialize(model, *params):
+    """Specialize a variogram model
+
+    Bind fixed model parameters to a variogram function. The returned
+    function only takes the lag. Unlike a closure, it can be pickled,
+    if ``model`` can be pickled.
+
+    Parameters
+    ----------
+    model : callable
+        Variogram function taking the lag as first argument.
+    params : float
+        Model parameters, in the order expected by ``model``.
+
+    Returns
+    -------
+    fitted_model : callable
+        The variogram function with all parameters hard-coded.
+
+    """
+    return partial(_fitted_model, model, params)
+
+
+@njit(cache=True, fastmath=FASTMATH, error_model='numpy')
+def _spherical_lag(h, r, inv_r, c0, b):
+    # a zero range is a pure nugget model, the sill is reached at any lag
+    if r == 0:
+        return b if h == 0 else b + c0
+
+    # constants in the type of the lag keep float32 lags in single precision
+    t = type(h)
+
+    # the polynomial is 1 at h = r, thus clamping h to the range
+    # replaces the branch and the loop can be vectorized. Like any lag
+    # beyond the range, a NaN lag fails h < r and returns the sill
+    u = (h if h < r else r) * inv_r
+    return b + c0 * (u * (t(1.5) - t(0.5) * u * u))
+
+
+@njit(_signatures(3), parallel=True, fastmath=FASTMATH, error_model='numpy', cache=True)
+def _spherical_core(h, r, c0, b):
+    # prepare parameters in the precision of the lags
+    inv_r = type(r)(1.) / r
+    out = np.empty_like(h)
+
+    if h.size < PARALLEL_THRESHOLD:
+        for i in range(h.size):
+            out[i] = _spherical_lag(h[i], r, inv_r, c0, b)
+    else:
+        for i in prange(h.size):
+            out[i] = _spherical_lag(h[i], r, inv_r, c0, b)
+    return out
+
+
+def _spherical_arr(h, r, c0, b=0.0):
+    # the eagerly compiled cores can't fill in omitted default arguments
+    return _spherical_core(_core_lags(h), r, c0, b)
+
+
+@variogram(kernel=_spherical_arr)
 def spherical(h, r, c0, b=0.0):
     r"""Spherical Variogram function
 
@@ -31,6 +272,7 @@ def spherical(h, r, c0, b=0.0):
     h : float
         Specifies the lag of separating distances that the dependent variable
         shall be calculated for. It has to be a positive real number.
+        A NaN lag returns the sill, like a lag beyond the range.
     r : float
         The effective range. Note this is not the range parameter! However,
         for the spherical variogram the range and effective range are the same.
@@ -73,17 +315,30 @@ def spherical(h, r, c0, b=0.0):
        http://doi.org/10.1111/j.1365-2389.1980.tb02084.x
 
     """
-    # prepare parameters
-    a = r / 1.
-
     if h <= r:
-        return b + c0 * ((1.5 * (h / a)) - (0.5 * ((h / a) ** 3.0)))
+        # a zero range leaves the lag 0 only, which is the nugget
+        if r == 0:
+            return b
+        u = h * (1. / r)
+        return b + c0 * ((1.5 * u) - (0.5 * (u * u * u)))
     else:
         return b + c0
 
 
-@variogram
-@jit(nopython=True)
+def _exponential_arr(h, r, c0, b=0.0):
+    if r == 0:
+        return _nugget_model(h, c0, b)
+
+    # prepare parameters
+    a = r / 3.
+
+    # np.exp on the whole array uses the SIMD exp loops of NumPy. Like the
+    # compiled kernels, a tiny range results in inf instead of raising
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return b + c0 * (1. - np.exp(-h * np.divide(1., a)))
+
+
+@variogram(kernel=_exponential_arr)
 def exponential(h, r, c0, b=0.0):
     r"""Exponential Variogram function
 
@@ -144,8 +399,20 @@ def exponential(h, r, c0, b=0.0):
     return b + c0 * (1. - math.exp(-(h / a)))
 
 
-@variogram
-@jit(nopython=True)
+def _gaussian_arr(h, r, c0, b=0.0):
+    if r == 0:
+        return _nugget_model(h, c0, b)
+
+    # prepare parameters
+    a = r / 2.
+
+    # np.exp on the whole array uses the SIMD exp loops of NumPy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_a2 = np.divide(1., a * a)
+        return b + c0 * (1. - np.exp(-h * h * inv_a2))
+
+
+@variogram(kernel=_gaussian_arr)
 def gaussian(h, r, c0, b=0.0):
     r""" Gaussian Variogram function
 
@@ -209,8 +476,39 @@ def gaussian(h, r, c0, b=0.0):
     return b + c0 * (1. - math.exp(- (h ** 2 / a ** 2)))
 
 
-@variogram
-@jit(nopython=True)
+@njit(cache=True, fastmath=FASTMATH, error_model='numpy')
+def _cubic_lag(h, r, inv_r, c0, b):
+    if r == 0:
+        return b if h == 0 else b + c0
+
+    # the polynomial is 1 at h = r, thus clamping h to the range
+    # replaces the branch, a NaN lag returns the sill
+    t = type(h)
+    u = (h if h < r else r) * inv_r
+    u2 = u * u
+    return b + c0 * (u2 * (t(7.) + u * (t(-8.75) + u2 * (t(3.5) - t(0.75) * u2))))
+
+
+@njit(_signatures(3), parallel=True, fastmath=FASTMATH, error_model='numpy', cache=True)
+def _cubic_core(h, r, c0, b):
+    # prepare parameters in the precision of the lags
+    inv_r = type(r)(1.) / r
+    out = np.empty_like(h)
+
+    if h.size < PARALLEL_THRESHOLD:
+        for i in range(h.size):
+            out[i] = _cubic_lag(h[i], r, inv_r, c0, b)
+    else:
+        for i in prange(h.size):
+            out[i] = _cubic_lag(h[i], r, inv_r, c0, b)
+    return out
+
+
+def _cubic_arr(h, r, c0, b=0.0):
+    return _cubic_core(_core_lags(h), r, c0, b)
+
+
+@variogram(kernel=_cubic_arr)
 def cubic(h, r, c0, b=0.0):
     r"""Cubic Variogram function
 
@@ -222,6 +520,7 @@ def cubic(h, r, c0, b=0.0):
     h : float
         Specifies the lag of separating distances that the dependent variable
         shall be calculated for. It has to be a positive real number.
+        A NaN lag returns the sill, like a lag beyond the range.
     r : float
         The effective range. Note this is not the range parameter! However,
         for the cubic variogram the range and effective range are the same.
@@ -261,20 +560,50 @@ def cubic(h, r, c0, b=0.0):
         geostatistical modeling and kriging (Vol. 998). John Wiley & Sons.
 
     """
-    # prepare parameters
-    a = r / 1.
-
-    if h < r:
-        return b + c0 * ((7 * (h ** 2 / a ** 2)) -
-                         ((35 / 4) * (h ** 3 / a ** 3)) +
-                         ((7 / 2) * (h ** 5 / a ** 5)) -
-                         ((3 / 4) * (h ** 7 / a ** 7)))
+    # the polynomial is 1 at h = r, thus h = r can be included here
+    if h <= r:
+        # a zero range leaves the lag 0 only, which is the nugget
+        if r == 0:
+            return b
+        u = h * (1. / r)
+
+        # Horner form of 7u^2 - 35/4u^3 + 7/2u^5 - 3/4u^7
+        u2 = u * u
+        return b + c0 * (u2 * (7. + u * (-8.75 + u2 * (3.5 - 0.75 * u2))))
     else:
         return b + c0
 
 
-@variogram
-@jit(nopython=True)
+@njit(cache=True, fastmath=FASTMATH, error_model='numpy')
+def _stable_lag(h, inv_a, c0, s, b):
+    # if s gts too small, we run into a zeroDivision error at lag 0
+    if h == 0:
+        return b
+    return b + c0 * (type(h)(1.) - math.exp(- math.pow(h * inv_a, s)))
+
+
+@njit(_signatures(4), parallel=True, fastmath=FASTMATH, error_model='numpy', cache=True)
+def _stable_core(h, r, c0, s, b):
+    # prepare parameters
+    t = type(r)
+    a = r / math.pow(t(3.), t(1.) / s)
+    inv_a = t(1.) / a
+    out = np.empty_like(h)
+
+    if h.size < PARALLEL_THRESHOLD:
+        for i in range(h.size):
+            out[i] = _stable_lag(h[i], inv_a, c0, s, b)
+    else:
+        for i in prange(h.size):
+            out[i] = _stable_lag(h[i], inv_a, c0, s, b)
+    return out
+
+
+def _stable_arr(h, r, c0, s, b=0.0):
+    return _stable_core(_core_lags(h), r, c0, s, b)
+
+
+@variogram(kernel=_stable_arr)
 def stable(h, r, c0, s, b=0.0):
     r"""Stable Variogram function
 
@@ -345,8 +674,36 @@ def stable(h, r, c0, s, b=0.0):
     return b + c0 * (1. - math.exp(- math.pow(h / a, s)))
 
 
-@variogram
-@jit(forceobj=True)
+def _matern_arr(h, r, c0, s, b=0.0):
+    if r == 0:
+        return _nugget_model(h, c0, b)
+
+    # prepare parameters
+    gamma, kv = _special()
+    a = r / 2.
+    coef = 2 / gamma(s)
+    sqrt_s = math.sqrt(s)
+
+    # lag 0 returns the nugget
+    out = np.full_like(h, b)
+    mask = h != 0
+
+    # calculate all lags in one vectorized SciPy call
+    u = h[mask] * (sqrt_s / a)
+    k = kv(s, 2 * u)
+
+    # numexpr fuses the remaining expression into one multi-threaded pass
+    if NUMEXPR_AVAILABLE and u.size >= PARALLEL_THRESHOLD:
+        out[mask] = ne.evaluate(
+            'b + c0 * (1. - coef * u ** s * k)',
+            local_dict=dict(b=b, c0=c0, coef=coef, u=u, s=s, k=k)
+        )
+    else:
+        out[mask] = b + c0 * (1. - coef * np.power(u, s) * k)
+    return out
+
+
+@variogram(kernel=_matern_arr)
 def matern(h, r, c0, s, b=0.0):
     r"""Matérn Variogram function
 
@@ -414,10 +771,147 @@ def matern(h, r, c0, s, b=0.0):
     if h == 0:
         return b
     # prepare parameters
+    gamma, kv = _special()
     a = r / 2.
+    u = h * (math.sqrt(s) / a)
 
     # calculate
-    return b + c0 * (1. - (2 / special.gamma(s)) *
-                     np.power((h * np.sqrt(s)) / a, s) *
-                     special.kv(s, 2 * ((h * np.sqrt(s)) / a))
-                     )
+    return b + c0 * (1. - (2 / gamma(s)) *
+                     np.power(u, s) * kv(s, 2 * u))
+
+
+# identifiers of the models supported by the compiled batch evaluation
+MODEL_IDS = dict(spherical=0, exponential=1, gaussian=2, cubic=3, stable=4)
+
+
+@njit(cache=True, fastmath=FASTMATH, error_model='numpy')
+def _model_lag(h, model_id, r, inv_a, c0, s, b):
+    # a zero range is a pure nugget model for all models
+    if r == 0:
+        return b if h == 0 else b + c0
+
+    if model_id == 0:
+        return _spherical_lag(h, r, inv_a, c0, b)
+    elif model_id == 1:
+        return b + c0 * (1. - math.exp(-h * inv_a))
+    elif model_id == 2:
+        return b + c0 * (1. - math.exp(-h * h * inv_a * inv_a))
+    elif model_id == 3:
+        return _cubic_lag(h, r, inv_a, c0, b)
+    else:
+        return _stable_lag(h, inv_a, c0, s, b)
+
+
+@njit(
+    [
+        types.float64[:, ::1](
+            types.Array(types.float64, 1, 'C', readonly=readonly),
+            types.float64[:, ::1], types.int64[::1], types.float64[:, ::1]
+        )
+        for readonly in (False, True)
+    ],
+    parallel=True, fastmath=FASTMATH, error_model='numpy', cache=True
+)
+def _evaluate_models(h, params, model_ids, out):
+    n_models = model_ids.size
+
+    # prepare parameters, params rows are (r, c0, b, s)
+    inv_a = np.empty(n_models)
+    for k in range(n_models):
+        r = params[k, 0]
+        if model_ids[k] == 1:
+            inv_a[k] = 3. / r
+        elif model_ids[k] == 2:
+            inv_a[k] = 2. / r
+        elif model_ids[k] == 4:
+            inv_a[k] = math.pow(3., 1. / params[k, 3]) / r
+        else:
+            inv_a[k] = 1. / r
+
+    # load every lag once and evaluate all models on it
+    if h.size < PARALLEL_THRESHOLD:
+        for i in range(h.size):
+            hi = h[i]
+            for k in range(n_models):
+                out[k, i] = _model_lag(
+                    hi, model_ids[k], params[k, 0], inv_a[k],
+                    params[k, 1], params[k, 3], params[k, 2]
+                )
+    else:
+        for i in prange(h.size):
+            hi = h[i]
+            for k in range(n_models):
+                out[k, i] = _model_lag(
+                    hi, model_ids[k], params[k, 0], inv_a[k],
+                    params[k, 1], params[k, 3], params[k, 2]
+                )
+    return out
+
+
+def evaluate_models(h, specs):
+    """Evaluate multiple models
+
+    Evaluates several theoretical variogram models on the same lags.
+    All compiled models are evaluated in a single pass over the lags,
+    which is faster than calling each model function on its own, if
+    many candidate models are compared on the same lags.
+
+    Parameters
+    ----------
+    h : numpy.ndarray
+        The lags all models shall be evaluated for.
+    specs : list
+        List of ``(name, params)`` tuples. ``name`` is the name of a
+        model function in this module and ``params`` are the model
+        parameters in the same order as accepted by the model
+        function, e.g. ``('stable', (r, c0, s, b))``. The nugget
+        is optional.
+
+    Returns
+    -------
+    gamma : numpy.ndarray
+        Array of shape ``(len(specs), *h.shape)`` holding the
+        semi-variances of each model.
+
+    """
+    h = np.asarray(h, dtype=float)
+    lags = h.ravel()
+
+    # collect the compiled models, matern relies on SciPy and is called directly
+    out = np.empty((len(specs), lags.size))
+    params, model_ids, rows = [], [], []
+    for row, (name, args) in enumerate(specs):
+        if name != 'matern' and name not in MODEL_IDS:
+            raise ValueError('The model %s is not understood.' % name)
+
+        # the nugget is optional, all other parameters are required
+        n_params = 3 if name in ('stable', 'matern') else 2
+        if not n_params <= len(args) <= n_params + 1:
+            raise ValueError(
+                'The %s model takes %d or %d parameters, but %d were given.'
+                % (name, n_params, n_params + 1, len(args))
+            )
+
+        if name == 'matern':
+            out[row] = matern(lags, *args)
+            continue
+
+        # order the parameters as (r, c0, b, s)
+        if name == 'stable':
+            r, c0, s, b = (list(args) + [0.0])[:4]
+        else:
+            r, c0, b = (list(args) + [0.0])[:3]
+            s = 0.0
+        params.append((r, c0, b, s))
+        model_ids.append(MODEL_IDS[name])
+        rows.append(row)
+
+    if len(rows) > 0:
+        out[rows] = _evaluate_models(
+            lags,
+            np.asarray(params, dtype=float),
+            np.asarray(model_ids, dtype=np.int64),
+            np.empty((len(rows), lags.size))
+        )
+
+    return out.reshape((len(specs), ) + h.shape)
@@ -0,0 +1,141 @@
+"""
+CUDA implementations of the theoretical variogram models. The functions
+take the same parameters as the array kernels in :mod:`skgstat.models`
+and evaluate all lags on a CUDA device, one thread per lag. This pays off
+for very large lag arrays, like the distance matrices of kriging on large
+grids, where the transfer to the device is cheap compared to the model
+evaluation. The Matérn model relies on SciPy and is not available.
+"""
+import math
+
+import numpy as np
+from numba import cuda
+
+
+# number of threads per block for all kernel launches
+THREADS_PER_BLOCK = 256
+
+
+def is_available():
+    """Check if a CUDA device can be used"""
+    return cuda.is_available()
+
+
+def _reciprocal(x):
+    # like on the CPU, a zero range results in inf instead of raising
+    with np.errstate(divide='ignore'):
+        return np.divide(1., x)
+
+
+def _launch(kernel, h, *params):
+    # the kernels compute in the precision of the lags
+    params = [h.dtype.type(p) for p in params]
+
+    # copy the lags to the device and allocate the output there
+    d_h = cuda.to_device(h)
+    d_out = cuda.device_array_like(d_h)
+
+    blocks = (h.size + THREADS_PER_BLOCK - 1) // THREADS_PER_BLOCK
+    kernel[blocks, THREADS_PER_BLOCK](d_h, *params, d_out)
+
+    return d_out.copy_to_host()
+
+
+@cuda.jit
+def _spherical_cuda(h, r, inv_r, c0, b, out):
+    i = cuda.grid(1)
+    if i < h.size:
+        # a zero range is a pure nugget model, like on the CPU
+        if r == 0:
+            out[i] = b if h[i] == 0 else b + c0
+            return
+
+        # constants in the type of the lag keep float32 lags in single precision
+        t = type(r)
+        u = (h[i] if h[i] < r else r) * inv_r
+        out[i] = b + c0 * (u * (t(1.5) - t(0.5) * u * u))
+
+
+@cuda.jit
+def _exponential_cuda(h, inv_a, c0, b, out):
+    i = cuda.grid(1)
+    if i < h.size:
+        # lag 0 is the nugget, also for a zero range with an infinite inv_a
+        if h[i] == 0:
+            out[i] = b
+        else:
+            out[i] = b + c0 * (type(b)(1.) - math.exp(-h[i] * inv_a))
+
+
+@cuda.jit
+def _gaussian_cuda(h, inv_a2, c0, b, out):
+    i = cuda.grid(1)
+    if i < h.size:
+        if h[i] == 0:
+            out[i] = b
+        else:
+            out[i] = b + c0 * (type(b)(1.) - math.exp(-h[i] * h[i] * inv_a2))
+
+
+@cuda.jit
+def _cubic_cuda(h, r, inv_r, c0, b, out):
+    i = cuda.grid(1)
+    if i < h.size:
+        if r == 0:
+            out[i] = b if h[i] == 0 else b + c0
+            return
+
+        t = type(r)
+        u = (h[i] if h[i] < r else r) * inv_r
+        u2 = u * u
+        out[i] = b + c0 * (u2 * (t(7.) + u * (t(-8.75) + u2 * (t(3.5) - t(0.75) * u2))))
+
+
+@cuda.jit
+def _stable_cuda(h, inv_a, c0, s, b, out):
+    i = cuda.grid(1)
+    if i < h.size:
+        # if s gts too small, we run into a zeroDivision error at lag 0
+        if h[i] == 0:
+            out[i] = b
+        else:
+            out[i] = b + c0 * (type(b)(1.) - math.exp(- math.pow(h[i] * inv_a, s)))
+
+
+def spherical(h, r, c0, b=0.0):
+    """Spherical model, see :func:`skgstat.models.spherical`"""
+    return _launch(_spherical_cuda, h, r, _reciprocal(r), c0, b)
+
+
+def exponential(h, r, c0, b=0.0):
+    """Exponential model, see :func:`skgstat.models.exponential`"""
+    return _launch(_exponential_cuda, h, _reciprocal(r / 3.), c0, b)
+
+
+def gaussian(h, r, c0, b=0.0):
+    """Gaussian model, see :func:`skgstat.models.gaussian`"""
+    a = r / 2.
+    return _launch(_gaussian_cuda, h, _reciprocal(a * a), c0, b)
+
+
+def cubic(h, r, c0, b=0.0):
+    """Cubic model, see :func:`skgstat.models.cubic`"""
+    return _launch(_cubic_cuda, h, r, _reciprocal(r), c0, b)
+
+
+def stable(h, r, c0, s, b=0.0):
+    """Stable model, see :func:`skgstat.models.stable`"""
+    # tiny shapes overflow the range parameter, like on the CPU
+    with np.errstate(over='ignore'):
+        a = r / np.power(3., _reciprocal(s))
+    return _launch(_stable_cuda, h, _reciprocal(a), c0, s, b)
+
+
+# models implemented for CUDA devices
+KERNELS = dict(
+    spherical=spherical,
+    exponential=exponential,
+    gaussian=gaussian,
+    cubic=cubic,
+    stable=stable,
+)
@@ -334,6 +334,25 @@ class TestGstoolsAllModels(unittest.TestCase):
     def test_matern_model(self):
         self.assert_model('matern')
 
+    def test_model_map_unchanged(self):
+        if not GSTOOLS_AVAILABLE:  # pragma: no cover
+            return True
+        from copy import deepcopy
+        from skgstat.interfaces.gstools import MODEL_MAP
+        before = deepcopy(MODEL_MAP)
+
+        # exporting must not alter the shared model map
+        V = Variogram(self.c, self.v, model='spherical', normalize=False)
+        V.to_gstools()
+
+        self.assertEqual(before, MODEL_MAP)
+
+    def test_stable_rescale_overflow(self):
+        from skgstat.interfaces.gstools import stable_rescale
+
+        self.assertAlmostEqual(stable_rescale({'shape': 0.5}), 9.)
+        self.assertEqual(stable_rescale({'shape': 0.001}), np.inf)
+
 
 class TestGstoolsKrige(unittest.TestCase):
     def setUp(self):
@@ -4,11 +4,12 @@
 import unittest
 
 import numpy as np
+import pandas as pd
 from numpy.testing import assert_array_almost_equal
 
 from skgstat.models import spherical, exponential
 from skgstat.models import gaussian, cubic, stable, matern
-from skgstat.models import variogram
+from skgstat.models import variogram, evaluate_models, VariogramKernel
 
 
 class TestModels(unittest.TestCase):
@@ -166,6 +167,267 @@ class TestModels(unittest.TestCase):
 
         assert_array_almost_equal(result, model, decimal=2)
 
+    def test_array_kernels(self):
+        # the array kernels have to match the scalar functions
+        h = np.linspace(0, 100, 51)
+        for f, args in (
+            (spherical, (40, 10, 1)),
+            (exponential, (40, 10, 1)),
+            (gaussian, (40, 10, 1)),
+            (cubic, (40, 10, 1)),
+            (stable, (40, 10, 1.5, 1)),
+            (matern, (40, 10, 1.5, 1)),
+        ):
+            scalar = [f.py_func(_, *args) for _ in h]
+            assert_array_almost_equal(f(h, *args), scalar, decimal=6)
+
+    def test_parallel_array_kernels(self):
+        # large lag arrays are processed by the parallel loop
+        h = np.linspace(0, 100, 5001)
+        for f, args in (
+            (spherical, (40, 10, 1)),
+            (exponential, (40, 10, 1)),
+            (stable, (40, 10, 0.5, 1)),
+        ):
+            scalar = [f.py_func(_, *args) for _ in h]
+            assert_array_almost_equal(f(h, *args), scalar, decimal=6)
+
+    def test_matern_numexpr(self):
+        from skgstat import models
+        if not models.NUMEXPR_AVAILABLE:  # pragma: no cover
+            return True
+
+        # large arrays are evaluated by numexpr
+        h = np.linspace(0, 100, 5001)
+        result = matern(h, 40, 10, 1.5, 1)
+
+        models.NUMEXPR_AVAILABLE = False
+        try:
+            assert_array_almost_equal(result, matern(h, 40, 10, 1.5, 1))
+        finally:
+            models.NUMEXPR_AVAILABLE = True
+
+    def test_float32_kernels(self):
+        # single precision lags are evaluated in single precision
+        h = np.linspace(0, 100, 5001)
+        for f, args in (
+            (spherical, (40, 10, 1)),
+            (exponential, (40, 10, 1)),
+            (gaussian, (40, 10, 1)),
+            (cubic, (40, 10, 1)),
+            (stable, (40, 10, 1.5, 1)),
+            (matern, (40, 10, 1.5, 1)),
+        ):
+            result = f(h.astype(np.float32), *args)
+
+            self.assertEqual(result.dtype, np.float32)
+            assert_array_almost_equal(result, f(h, *args), decimal=4)
+
+    def test_array_kernel_overflow(self):
+        # a tiny shape overflows the range parameter, like for scalar lags
+        h = np.array([0., 5., 10.])
+        with np.errstate(all='ignore'):
+            scalar = [stable.py_func(_, 40, 10, 0.001, 1) for _ in h]
+        assert_array_almost_equal(stable(h, 40, 10, 0.001, 1), scalar)
+
+        # a zero range is a pure nugget model and does not raise
+        for f, args in (
+            (spherical, (0., 10., 1.)),
+            (exponential, (0., 10., 1.)),
+            (gaussian, (0., 10., 1.)),
+            (cubic, (0., 10., 1.)),
+            (stable, (0., 10., 1.5, 1.)),
+            (matern, (0., 10., 1.5, 1.)),
+        ):
+            assert_array_almost_equal(f(h, *args), [1., 11., 11.])
+            assert_array_almost_equal(f(h.astype(np.float32), *args), [1., 11., 11.])
+        for f in (spherical, cubic):
+            assert_array_almost_equal([f(_, 0., 10., 1.) for _ in h], [1., 11., 11.])
+
+        specs = [(name, (0., 10., 1.)) for name in ('spherical', 'exponential', 'gaussian', 'cubic')]
+        specs += [('stable', (0., 10., 1.5, 1.)), ('matern', (0., 10., 1.5, 1.))]
+        assert_array_almost_equal(evaluate_models(h, specs), [[1., 11., 11.]] * 6)
+
+    def test_nan_lag(self):
+        # scalar and array lags return the sill for NaN, like beyond the range
+        for f in (spherical, cubic):
+            self.assertEqual(f(np.nan, 40, 10, 1), 11.)
+            assert_array_almost_equal(f(np.array([np.nan, 50.]), 40, 10, 1), [11., 11.])
+
+    def test_eager_kernels(self):
+        from skgstat import models
+
+        # the kernels are compiled on import, calls do not add new versions
+        h = np.linspace(0, 100, 51)
+        for core in (models._spherical_core, models._cubic_core, models._stable_core):
+            self.assertEqual(len(core.signatures), 4)
+        spherical.kernel(h, 40, 10)
+        stable.kernel(h.astype(np.float32), 40, 10, 2)
+        self.assertEqual(len(models._spherical_core.signatures), 4)
+        self.assertEqual(len(models._stable_core.signatures), 4)
+
+    def test_readonly_kernels(self):
+        # read-only lags, like memory maps, are accepted by all kernels
+        h = np.linspace(0, 100, 51)
+        h.setflags(write=False)
+        for f, args in (
+            (spherical, (40, 10, 1)),
+            (exponential, (40, 10, 1)),
+            (gaussian, (40, 10, 1)),
+            (cubic, (40, 10, 1)),
+            (stable, (40, 10, 1.5, 1)),
+            (matern, (40, 10, 1.5, 1)),
+        ):
+            expected = f(h.copy(), *args)
+            assert_array_almost_equal(f(h, *args), expected)
+
+        h32 = h.astype(np.float32)
+        h32.setflags(write=False)
+        assert_array_almost_equal(spherical.kernel(h32, 40, 10), spherical(h, 40, 10), decimal=4)
+
+        result = evaluate_models(h, [('spherical', (40, 10)), ('stable', (40, 10, 1.5))])
+        assert_array_almost_equal(result[0], spherical(h.copy(), 40, 10))
+
+    def test_strided_kernels(self):
+        # non-contiguous lags are copied before they are passed to the kernels
+        h = np.linspace(0, 100, 101)[::2]
+        readonly = np.linspace(0, 100, 101)[::2]
+        readonly.setflags(write=False)
+        for f, args in (
+            (spherical, (40, 10, 1)),
+            (cubic, (40, 10, 1)),
+            (stable, (40, 10, 1.5, 1)),
+        ):
+            assert_array_almost_equal(f.kernel(h, *args), f(h.copy(), *args))
+            assert_array_almost_equal(f.kernel(readonly, *args), f(h.copy(), *args))
+
+    def test_array_kernel_shape(self):
+        h = np.arange(12).reshape(3, 4)
+        result = spherical(h, 5, 10)
+
+        self.assertEqual(result.shape, (3, 4))
+        assert_array_almost_equal(result.flatten(), spherical(h.flatten(), 5, 10))
+
+
+class TestEvaluateModels(unittest.TestCase):
+    def setUp(self):
+        self.specs = [
+            ('spherical', (40, 10)),
+            ('exponential', (40, 10, 1)),
+            ('gaussian', (40, 10, 1)),
+            ('cubic', (40, 10, 1)),
+            ('stable', (40, 10, 1.5)),
+            ('matern', (40, 10, 1.5, 1)),
+        ]
+
+    def test_single_models(self):
+        for n in (51, 5001):
+            h = np.linspace(0, 100, n)
+            result = evaluate_models(h, self.specs)
+
+            self.assertEqual(result.shape, (6, n))
+            for row, (name, args) in zip(result, self.specs):
+                model = globals()[name]
+                assert_array_almost_equal(row, model(h, *args), decimal=6)
+
+    def test_unknown_model(self):
+        with self.assertRaises(ValueError):
+            evaluate_models(np.arange(5), [('linear', (1, 1))])
+
+    def test_parameter_count(self):
+        for spec in (
+            ('spherical', (40, 10, 1, 99)),
+            ('spherical', (40, )),
+            ('stable', (40, 10)),
+            ('matern', (40, 10, 1.5, 1, 99)),
+        ):
+            with self.assertRaises(ValueError) as e:
+                evaluate_models(np.arange(5), [spec])
+            self.assertTrue('parameters' in str(e.exception))
+
+
+class TestBackend(unittest.TestCase):
+    def setUp(self):
+        self.h = np.linspace(0, 100, 51)
+
+    def test_cpu_backend(self):
+        assert_array_almost_equal(
+            spherical(self.h, 40, 10, backend='cpu'),
+            spherical(self.h, 40, 10)
+        )
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError) as e:
+            spherical(self.h, 40, 10, backend='gpu')
+
+        self.assertTrue("has to be one of 'cpu' or 'cuda'" in str(e.exception))
+
+        # scalar lags check the backend as well
+        with self.assertRaises(ValueError):
+            spherical(5., 40, 10, backend='gpu')
+
+    def test_backend_argument(self):
+        # functions without a kernel pass the backend on like any argument
+        @variogram
+        def adder(l, a, backend=0):
+            return l + a + backend
+
+        self.assertEqual(adder(1., 4, backend=2), 7)
+        assert_array_almost_equal(adder([1, 4, 8], 4, backend=2), [7, 10, 14])
+
+    def test_cuda_not_supported(self):
+        # matern relies on scipy and has no CUDA implementation
+        with self.assertRaises(RuntimeError):
+            matern(self.h, 40, 10, 1.5, backend='cuda')
+
+
+class TestCudaKernels(unittest.TestCase):
+    """
+    Run with NUMBA_ENABLE_CUDASIM=1 to test the kernels without a CUDA device
+    """
+    def setUp(self):
+        from skgstat import models_cuda
+        self.kernels = models_cuda.KERNELS
+        self.available = models_cuda.is_available()
+        self.h = np.linspace(0, 100, 51)
+
+    def test_kernels_match_cpu(self):
+        if not self.available:  # pragma: no cover
+            return True
+
+        for name, args in (
+            ('spherical', (40, 10, 1)),
+            ('exponential', (40, 10, 1)),
+            ('gaussian', (40, 10, 1)),
+            ('cubic', (40, 10, 1)),
+            ('stable', (40, 10, 1.5, 1)),
+        ):
+            model = globals()[name]
+            assert_array_almost_equal(
+                self.kernels[name](self.h, *args),
+                model(self.h, *args, backend='cpu'),
+                decimal=10
+            )
+
+    def test_overflow(self):
+        if not self.available:  # pragma: no cover
+            return True
+
+        # a tiny shape overflows the range parameter, like on the CPU
+        h = np.array([0., 5., 10.])
+        assert_array_almost_equal(
+            stable(h, 40, 10, 0.001, backend='cuda'),
+            stable(h, 40, 10, 0.001, backend='cpu')
+        )
+        for f in (spherical, exponential, gaussian, cubic):
+            assert_array_almost_equal(
+                f(h, 0., 10., 1., backend='cuda'), [1., 11., 11.]
+            )
+        for f in (spherical, cubic):
+            assert_array_almost_equal(
+                f(np.array([np.nan]), 40., 10., 1., backend='cuda'), [11.]
+            )
+
 
 class TestVariogramDecorator(unittest.TestCase):
     def test_scalar(self):
@@ -176,6 +438,15 @@ class TestVariogramDecorator(unittest.TestCase):
         a, b = 1, 4
         self.assertEqual(scalar_function(1, 4), (a, b))
 
+    def test_entry_points(self):
+        @variogram
+        def adder(l, a):
+            return l + a
+
+        self.assertIsNone(adder.kernel)
+        self.assertEqual(spherical.py_func(5, 10, 4), spherical(5, 10, 4))
+        self.assertAlmostEqual(spherical.kernel(np.array([5.]), 10, 4)[0], spherical(5, 10, 4))
+
     def test_list(self):
         @variogram
         def adder(l, a):
@@ -186,6 +457,42 @@ class TestVariogramDecorator(unittest.TestCase):
         for r, c in zip(res, adder([1, 4, 8], 4)):
             self.assertEqual(r, c)
 
+    def test_list_kernel(self):
+        # lists and tuples are evaluated by the array kernel
+        h = [0, 5, 10, 20]
+        expected = [spherical.py_func(_, 10, 4) for _ in h]
+
+        assert_array_almost_equal(spherical(h, 10, 4), expected)
+        assert_array_almost_equal(spherical(tuple(h), 10, 4), expected)
+
+    def test_iterables(self):
+        # iterables other than lists, tuples and arrays are mapped as well
+        h = range(0, 100, 10)
+        expected = [spherical.py_func(_, 40, 10) for _ in h]
+
+        assert_array_almost_equal(spherical(h, 40, 10), expected)
+        assert_array_almost_equal(spherical(pd.Series(h), 40, 10), expected)
+
+        @variogram
+        def adder(l, a):
+            return l + a
+
+        assert_array_almost_equal(adder(pd.Series([1, 4, 8]), 4), [5, 8, 12])
+
+    def test_variogram_kernel(self):
+        h = np.arange(12).reshape(3, 4)
+        lags = VariogramKernel(h)
+
+        # compiled and mapped models accept the prepared lags
+        assert_array_almost_equal(spherical(lags, 5, 10), spherical(h, 5, 10))
+        assert_array_almost_equal(matern(lags, 5, 10, 2), matern(h, 5, 10, 2))
+
+        @variogram
+        def adder(l, a):
+            return l + a
+
+        assert_array_almost_equal(adder(VariogramKernel([1, 4, 8]), 4), [5, 8, 12])
+
     def test_sum_spherical(self):
         @variogram
         def sum_spherical(h, r1, c1, r2, c2, b1=0, b2=0):
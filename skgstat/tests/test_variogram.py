@@ -1,6 +1,8 @@
 import unittest
 import os
+import gc
 import pickle
+import weakref
 import warnings
 
 import numpy as np
@@ -852,6 +854,24 @@ class TestVariogramFittingProcedure(unittest.TestCase):
             decimal=2
         )
 
+    def test_fitted_model_cached(self):
+        # the fitted model is only rebuilt for new parameters
+        fun = self.V.fitted_model
+        self.assertIs(fun, self.V.fitted_model)
+
+        self.V.cof = [c * 2 for c in self.V.cof]
+        self.assertIsNot(fun, self.V.fitted_model)
+
+    def test_fitted_model_released(self):
+        # the fitted model is stored on the instance only and can be pickled
+        ref = weakref.ref(self.V.fitted_model)
+        pickle.loads(pickle.dumps(self.V))
+
+        self.V.cof = [c * 2 for c in self.V.cof]
+        self.V.fitted_model
+        gc.collect()
+        self.assertIsNone(ref())
+
     def test_unavailable_method(self):
         with self.assertRaises(AttributeError) as e:
             self.V.fit(method='unsupported')